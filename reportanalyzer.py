@@ -1,57 +1,152 @@
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 import pandas as pd
 import io
+import os
+import hashlib
 import re
+import threading
+import time
+import zlib
 from pathlib import Path
 import json
+import statistics
+from collections import Counter
+from functools import lru_cache
 from datetime import datetime
-import plotly.graph_objects as go
-import plotly.express as px
-import PyPDF2
-import docx
-from typing import Dict, List, Set, Optional, Any, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Set, Optional, Any, Tuple, Iterator
 
-# Try to use NLTK for sentence tokenization, but provide fallback if not available
+# Optional Hyperscan DFA scanner for findings patterns, falls back to re
 try:
-    import nltk
-    from nltk.tokenize import sent_tokenize
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
+@st.cache_resource
+def _pdfium_lock() -> threading.Lock:
+    """
+    Return the lock serializing PDFium calls.
     
-    # Check if punkt is available, download if possible
+    PDFium may not be called from several threads at once, even for
+    different documents. Streamlit re-executes this module on every rerun
+    and for every session, so a module-level lock would not be shared;
+    the resource cache keeps one lock for the whole server process.
+    """
+    return threading.Lock()
+
+# Heavy parsing and plotting modules are imported on first
+# use to keep Streamlit cold starts fast
+
+@lru_cache(maxsize=1)
+def _load_pdfium():
+    """Import pypdfium2 for PDF text extraction, or return None to use PyPDF2"""
     try:
-        nltk.data.find('tokenizers/punkt')
-        NLTK_AVAILABLE = True
-    except LookupError:
-        try:
-            nltk.download('punkt', quiet=True)
-            NLTK_AVAILABLE = True
-        except Exception as e:
-            st.warning(f"NLTK punkt tokenizer not available: {e}. Using fallback tokenizer.")
-            NLTK_AVAILABLE = False
-except ImportError:
-    st.warning("NLTK not installed. Using fallback tokenizer.")
-    NLTK_AVAILABLE = False
+        import pypdfium2
+        return pypdfium2
+    except ImportError:
+        return None
 
-def fallback_sent_tokenize(text: str) -> List[str]:
-    """Simple sentence tokenizer when NLTK is not available"""
-    if not text:
-        return []
-    # Split by common sentence terminators followed by space/newline
-    sentences = re.split(r'(?<=[.!?])\s+', text)
-    # Filter out empty strings
-    return [s for s in sentences if s.strip()]
-
-def safe_sent_tokenize(text: str) -> List[str]:
-    """Use NLTK if available, otherwise use fallback tokenizer"""
+@st.cache_resource
+def _del_table() -> Dict[int, None]:
+    """
+    Return the str.translate table deleting non-printable BMP characters.
+    
+    Covers controls, format, private-use and unassigned characters, keeping
+    newlines. The rest of Unicode is mostly unassigned and would make the
+    table tens of MB, so _clean_text handles astral characters separately.
+    Building it takes a few milliseconds, so it is done on first use and
+    kept across reruns rather than at import.
+    """
+    return dict.fromkeys((c for c in range(0x10000) if c != 0x0A and not chr(c).isprintable()), None)
+
+FINDING_CATEGORIES = ('diagnoses', 'medications', 'vitals', 'lab_results', 'recommendations')
+
+# Processed reports kept for reuse across Process Files runs in a session
+REPORT_CACHE_MAX_ENTRIES = 64
+
+_RE_WS = re.compile(r'\s+')
+# Sentence terminators followed by whitespace or the end of the text
+_SENT_RE = re.compile(r'[.!?]+(?=\s|$)')
+
+# Timestamp shared by reports processed within the same 100ms window
+_last_ts = float('-inf')
+_last_iso = ''
+
+def _now_iso() -> str:
+    """Return the current time as an ISO string, refreshed at most every 100ms"""
+    global _last_ts, _last_iso
+    now = time.monotonic()
+    if now - _last_ts > 0.1:
+        _last_iso = datetime.now().isoformat()
+        _last_ts = now
+    return _last_iso
+
+def _byte_to_char_offsets(data: bytes, offsets: List[int]) -> List[int]:
+    """Convert sorted UTF-8 byte offsets in data to string offsets"""
+    char_offsets = []
+    chars = last = 0
+    for offset in offsets:
+        chars += len(data[last:offset].decode('utf-8'))
+        char_offsets.append(chars)
+        last = offset
+    return char_offsets
+
+def _sentence_count(text: str) -> int:
+    """Count sentences by their terminators, plus any unterminated tail"""
     if not text:
-        return []
+        return 0
+    count = len(_SENT_RE.findall(text))
+    if not text.endswith(('.', '!', '?')):
+        count += 1
+    return count
+
+def _keyword_prefix(pattern: str) -> Optional[str]:
+    """
+    Split a findings pattern at its trailing top-level lookahead.
     
-    if NLTK_AVAILABLE:
-        try:
-            return sent_tokenize(text)
-        except Exception:
-            pass  # Fall back to simple tokenizer on any error
+    A pattern of that form consumes only its keyword, so it can share one
+    alternation with the other categories. Group references are rejected
+    because group numbers shift inside the alternation.
+    
+    Args:
+        pattern: A findings regular expression
+        
+    Returns:
+        The pattern without its trailing lookahead, or None if it has no
+        trailing lookahead or refers to a group
+    """
+    depth = 0
+    group_start = group_end = class_start = -1
+    escaped = False
+    for i, c in enumerate(pattern):
+        if escaped:
+            # Outside a class, \1 to \9 are backreferences
+            if class_start < 0 and c in '123456789':
+                return None
+            escaped = False
+        elif c == '\\':
+            escaped = True
+        elif class_start >= 0:
+            # A ']' straight after '[' or '[^' is a literal
+            if c == ']' and i > class_start + 1 and pattern[class_start + 1:i] != '^':
+                class_start = -1
+        elif c == '[':
+            class_start = i
+        elif c == '(':
+            if pattern.startswith(('(?P=', '(?('), i):
+                return None
+            if depth == 0:
+                group_start = i
+            depth += 1
+        elif c == ')':
+            depth -= 1
+            if depth == 0:
+                group_end = i
     
-    return fallback_sent_tokenize(text)
+    if group_start > 0 and group_end == len(pattern) - 1 and pattern.startswith('(?=', group_start):
+        return pattern[:group_start]
+    return None
 
 
 class MedicalReportAnalyzer:
@@ -60,13 +155,172 @@ class MedicalReportAnalyzer:
     def __init__(self):
         self.reports = []
         self.summary = {}
-        self.findings_patterns = {
-            'diagnoses': r'(?:diagnosis|assessment|impression|diagnosed with)[:\s](.*?)(?:\n|$)',
-            'medications': r'(?:medication|drug|prescription|prescribed)[:\s](.*?)(?:\n|$)',
-            'vitals': r'(?:vital|measurement|blood pressure|temperature|pulse|height|weight)[:\s](.*?)(?:\n|$)',
-            'lab_results': r'(?:lab|laboratory|test|result|blood work)[:\s](.*?)(?:\n|$)',
-            'recommendations': r'(?:recommendation|plan|follow up|advised)[:\s](.*?)(?:\n|$)'
-        }
+        self._lock = threading.Lock()
+        # SHA-1 digests of files seen since the last clear_data
+        self._seen_hashes: Set[bytes] = set()
+        self._reset_columns()
+        # Serialized export, rebuilt only after reports or summary change
+        self._json_cache: Optional[str] = None
+        self._dirty = True
+        self._generated_at = ''
+        self._formatted_summary: Optional[str] = None
+        # Bumped whenever the summary changes; keys the cached charts
+        self._version = 0
+        self._bar_data: Tuple[Tuple[str, ...], Tuple[int, ...]] = ((), ())
+        self._pie_data: Tuple[Tuple[str, ...], Tuple[int, ...]] = ((), ())
+        # Processed reports keyed by (file hash, file type, patterns)
+        self._report_cache: Dict[tuple, Dict[str, Any]] = {}
+        # Each pattern consumes only its keyword and captures the following
+        # text in a lookahead, so categories can overlap in a single pass
+        self.set_findings_patterns({
+            'diagnoses': r'(?:diagnosis|assessment|impression|diagnosed with)[:\s](?=([^\n]{3,300}))',
+            'medications': r'(?:medication|drug|prescription|prescribed)[:\s](?=([^\n]{3,300}))',
+            'vitals': r'(?:vital|measurement|blood pressure|temperature|pulse|height|weight)[:\s](?=([^\n]{3,300}))',
+            'lab_results': r'(?:lab|laboratory|test|result|blood work)[:\s](?=([^\n]{3,300}))',
+            'recommendations': r'(?:recommendation|plan|follow up|advised)[:\s](?=([^\n]{3,300}))'
+        })
+    
+    def _reset_columns(self) -> None:
+        """Reset the per-report columns used for summary aggregation."""
+        # Kept alongside self.reports so aggregation avoids nested dict lookups
+        self._types: List[str] = []
+        self._dates: List[str] = []
+        self._word_counts: List[int] = []
+        self._sentence_counts: List[int] = []
+        self._findings: Dict[str, List[Set[str]]] = {category: [] for category in FINDING_CATEGORIES}
+    
+    def _append_report(self, report: Dict[str, Any]) -> None:
+        """Store a processed report and its aggregation columns."""
+        # Files may be processed concurrently; keep the columns in step
+        with self._lock:
+            self.reports.append(report)
+            self._types.append(report['type'])
+            self._dates.append(report['date'])
+            self._word_counts.append(report['metadata']['word_count'])
+            self._sentence_counts.append(report['metadata']['sentence_count'])
+            for category, items in report['key_findings'].items():
+                self._findings.setdefault(category, []).append(set(items))
+            self._dirty = True
+    
+    def set_findings_patterns(self, patterns: Dict[str, str]) -> None:
+        """
+        Validate and install new findings patterns.
+        
+        Patterns that capture their text in a trailing lookahead are compiled
+        into a single alternation with one named group per category, so one
+        pass over the content finds matches for all of them. Any other
+        pattern would swallow later keywords inside the alternation, so it
+        is scanned on its own. Nothing is changed unless every pattern
+        compiles.
+        
+        Args:
+            patterns: Regular expressions keyed by category name
+            
+        Raises:
+            re.error: If a pattern is invalid
+            TypeError: If a pattern is not a string
+        """
+        separate = {}
+        for category, pattern in patterns.items():
+            if not isinstance(pattern, str):
+                raise TypeError(f"Pattern for {category} must be a string")
+            # Compiled alone first so errors point into the user's pattern
+            separate[category] = re.compile(pattern, re.IGNORECASE | re.MULTILINE)
+        
+        prefixes = {}
+        for category, pattern in patterns.items():
+            prefix = _keyword_prefix(pattern)
+            if prefix is not None and category.isidentifier():
+                prefixes[category] = prefix
+        
+        compiled = None
+        capture_groups = {}
+        if prefixes:
+            try:
+                compiled = re.compile(
+                    '|'.join(f'(?P<{category}>{patterns[category]})' for category in prefixes),
+                    re.IGNORECASE | re.MULTILINE
+                )
+            except re.error:
+                # e.g. inline flags or group names that clash between patterns
+                prefixes = {}
+        if compiled is not None:
+            # The text to keep is the first capture group inside each category's
+            # named group; fall back to the whole match if the pattern has none
+            for category in prefixes:
+                index = compiled.groupindex[category]
+                capture_groups[category] = index + 1 if separate.pop(category).groups else index
+        hs_db = self._compile_hyperscan(list(prefixes.values())) if hyperscan is not None and prefixes else None
+        
+        self.findings_patterns = dict(patterns)
+        self._compiled = compiled
+        self._capture_groups = capture_groups
+        self._separate_patterns = separate
+        self._hs_db = hs_db
+    
+    def _compile_hyperscan(self, patterns: List[str]):
+        """
+        Compile the keyword parts of the findings patterns into a Hyperscan database.
+        
+        Hyperscan supports neither lookaheads nor captures, so only the part
+        of each pattern before its trailing lookahead is compiled; the re
+        pattern still resolves the capture at each candidate.
+        
+        Args:
+            patterns: Keyword parts as returned by _keyword_prefix
+            
+        Returns:
+            The compiled database, or None if Hyperscan rejects a pattern
+        """
+        flags = (hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_MULTILINE | hyperscan.HS_FLAG_SOM_LEFTMOST
+                 | hyperscan.HS_FLAG_UTF8 | hyperscan.HS_FLAG_UCP)
+        try:
+            db = hyperscan.Database()
+            db.compile(
+                expressions=[pattern.encode('utf-8') for pattern in patterns],
+                ids=list(range(len(patterns))),
+                elements=len(patterns),
+                flags=[flags] * len(patterns)
+            )
+            return db
+        except hyperscan.error:
+            # e.g. backreferences or lookarounds; the re scanner handles these
+            return None
+    
+    def _iter_matches(self, content: str) -> Iterator[re.Match]:
+        """
+        Yield matches of the combined findings pattern at each start position.
+        
+        Matches consume only their keyword, so the scan resumes one
+        character after each match start and keywords of other categories
+        that overlap it are still found. With Hyperscan available, it
+        locates candidate keyword starts and the compiled re pattern only
+        runs at those positions to resolve the category and capture group.
+        """
+        if self._compiled is None:
+            return
+        
+        if self._hs_db is None:
+            match = self._compiled.search(content)
+            while match:
+                yield match
+                match = self._compiled.search(content, match.start() + 1)
+            return
+        
+        data = content.encode('utf-8')
+        starts = set()
+        # The database's scratch space is shared, so scans are serialized
+        with self._lock:
+            self._hs_db.scan(data, match_event_handler=lambda id, start, end, flags, context: starts.add(start))
+        
+        offsets = sorted(starts)
+        if len(data) != len(content):
+            offsets = _byte_to_char_offsets(data, offsets)
+        
+        for start in offsets:
+            match = self._compiled.match(content, start)
+            if match:
+                yield match
         
     def process_file(self, file) -> bool:
         """
@@ -78,32 +332,114 @@ class MedicalReportAnalyzer:
         Returns:
             bool: True if file processed successfully, False otherwise
         """
+        return self.process_files([file])[0]
+    
+    def process_files(self, files, on_progress=None) -> List[bool]:
+        """
+        Process uploaded files concurrently, storing reports in upload order.
+        
+        Args:
+            files: The uploaded file objects
+            on_progress: Optional callback taking (done, total)
+            
+        Returns:
+            List[bool]: Per-file result, in the same order as files
+        """
+        total = len(files)
+        results = [False] * total
+        jobs = []
+        
+        # Dedupe in upload order so the first of identical uploads is kept
+        for i, file in enumerate(files):
+            try:
+                file.seek(0)
+                raw = file.read()
+            except Exception as e:
+                st.error(f"Error processing file {file.name}: {str(e)}")
+                continue
+            digest = hashlib.sha1(raw).digest()
+            if digest in self._seen_hashes:
+                st.info(f"Skipped duplicate file: {file.name}")
+                results[i] = True
+                continue
+            self._seen_hashes.add(digest)
+            jobs.append((i, file, raw, digest))
+        
+        done = total - len(jobs)
+        if on_progress is not None and done:
+            on_progress(done, total)
+        
+        reports = {}
+        if len(jobs) > 1:
+            # Workers call st.warning/st.error, which need the script context
+            ctx = get_script_run_ctx()
+            with ThreadPoolExecutor(
+                max_workers=min(8, len(jobs)),
+                initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx)
+            ) as executor:
+                futures = {executor.submit(self._build_report, *job[1:]): job[0] for job in jobs}
+                for future in as_completed(futures):
+                    reports[futures[future]] = future.result()
+                    done += 1
+                    if on_progress is not None:
+                        on_progress(done, total)
+        else:
+            for i, *job in jobs:
+                reports[i] = self._build_report(*job)
+                done += 1
+                if on_progress is not None:
+                    on_progress(done, total)
+        
+        # Append after the pool so report order does not depend on timing
+        for i, _, _, _ in jobs:
+            report = reports[i]
+            if report is not None:
+                self._append_report(report)
+                results[i] = True
+        
+        return results
+    
+    def _build_report(self, file, raw: bytes, digest: bytes) -> Optional[Dict[str, Any]]:
+        """Build the report for one file, or None if it cannot be processed."""
         try:
             file_ext = Path(file.name).suffix.lower()
             content = ""
             
-            file.seek(0)
+            # Reuse the previous result for identical content and patterns
+            cache_key = (digest, file_ext, tuple(sorted(self.findings_patterns.items())))
+            with self._lock:
+                cached = self._report_cache.pop(cache_key, None)
+                if cached is not None:
+                    # Re-insert to mark it as most recently used
+                    self._report_cache[cache_key] = cached
+            if cached is not None:
+                return dict(cached, name=file.name, date=_now_iso())
             
             if file_ext == '.pdf':
-                content = self._extract_pdf_content(file)
+                content = self._extract_pdf_content(raw)
             elif file_ext == '.txt':
-                content = file.read().decode('utf-8')
+                content = raw.decode('utf-8')
             elif file_ext in ['.doc', '.docx']:
-                content = self._extract_docx_content(file)
+                content = self._extract_docx_content(raw)
             else:
                 st.warning(f"Unsupported file format: {file_ext}")
-                return False
+                return None
+            
+            # A failed extraction has already been reported; its empty report
+            # is not cached, so the next run tries again and reports again
+            extracted = content is not None
             
             # Clean content
-            content = self._clean_text(content)
+            content = self._clean_text(content or "")
             
-            # Use the safe tokenizer instead of direct NLTK function
-            sentence_count = len(safe_sent_tokenize(content)) if content else 0
+            # Only the count is needed, so skip full sentence tokenization
+            sentence_count = _sentence_count(content)
             
             report = {
                 'name': file.name,
-                'content': content,
-                'date': datetime.now().isoformat(),
+                # Stored compressed to keep session state small; see get_content
+                'content': zlib.compress(content.encode('utf-8'), 1),
+                'date': _now_iso(),
                 'type': file_ext,
                 'key_findings': self.extract_key_findings(content),
                 'metadata': {
@@ -113,47 +449,115 @@ class MedicalReportAnalyzer:
                 }
             }
             
-            self.reports.append(report)
-            return True
+            if extracted:
+                self._cache_report(cache_key, report)
+            return report
             
         except Exception as e:
             st.error(f"Error processing file {file.name}: {str(e)}")
-            return False
+            return None
 
-    def _extract_pdf_content(self, file) -> str:
-        """Extract text content from PDF files."""
+    def _cache_report(self, cache_key: tuple, report: Dict[str, Any]) -> None:
+        """Store a processed report for reuse, evicting the least recently used."""
+        with self._lock:
+            self._report_cache[cache_key] = report
+            # Dicts keep insertion order, and hits are re-inserted
+            while len(self._report_cache) > REPORT_CACHE_MAX_ENTRIES:
+                del self._report_cache[next(iter(self._report_cache))]
+    
+    def _extract_pdf_content(self, data: bytes) -> Optional[str]:
+        """Extract text content from PDF file bytes, or None if extraction failed."""
         try:
-            pdf_bytes = io.BytesIO(file.read())
-            pdf_reader = PyPDF2.PdfReader(pdf_bytes)
-            content = "\n".join(page.extract_text() for page in pdf_reader.pages if page.extract_text())
+            pdfium = _load_pdfium()
+            if pdfium is not None:
+                texts = self._extract_pdfium_text(pdfium, data)
+            else:
+                texts = self._extract_pypdf2_text(data)
+            
+            content = "\n".join(text for text in texts if text)
             return content
         except Exception as e:
             st.error(f"Error extracting PDF content: {str(e)}")
-            return ""
+            return None
+    
+    def _extract_pdfium_text(self, pdfium, data: bytes) -> List[str]:
+        """Extract per-page text with pypdfium2."""
+        # PDFium is not thread-safe, so pages are read serially
+        with _pdfium_lock():
+            pdf = pdfium.PdfDocument(data)
+            try:
+                texts = []
+                for i in range(len(pdf)):
+                    page = pdf[i]
+                    textpage = page.get_textpage()
+                    texts.append(textpage.get_text_range())
+                    textpage.close()
+                    page.close()
+                return texts
+            finally:
+                pdf.close()
+    
+    def _extract_pypdf2_text(self, data: bytes) -> List[str]:
+        """Extract per-page text with PyPDF2."""
+        import PyPDF2
+        
+        # BytesIO over bytes shares the buffer rather than copying it
+        pdf_reader = PyPDF2.PdfReader(io.BytesIO(data))
+        # extract_text is pure Python and holds the GIL, so a thread pool
+        # cannot speed this up; pages are read serially with one reader
+        return [page.extract_text() or '' for page in pdf_reader.pages]
     
-    def _extract_docx_content(self, file) -> str:
-        """Extract text content from DOCX files."""
+    def _extract_docx_content(self, data: bytes) -> Optional[str]:
+        """Extract text content from DOCX file bytes, or None if extraction failed."""
         try:
-            doc = docx.Document(io.BytesIO(file.read()))
-            content = "\n".join(paragraph.text for paragraph in doc.paragraphs if paragraph.text)
+            import docx
+            from docx.oxml.ns import qn
+            
+            doc = docx.Document(io.BytesIO(data))
+            
+            # Read run contents straight from the XML instead of building
+            # Paragraph/Run objects. Runs often split words, so they are
+            # joined per top-level paragraph as doc.paragraphs would, with
+            # tabs and breaks rendered the way Run.text renders them.
+            text_tag = qn('w:t')
+            special_chars = {
+                qn('w:tab'): '\t',
+                qn('w:ptab'): '\t',
+                qn('w:br'): '\n',
+                qn('w:cr'): '\n',
+                qn('w:noBreakHyphen'): '-',
+            }
+            paragraphs = []
+            for p in doc.element.body.iterchildren(qn('w:p')):
+                parts = []
+                for run in p.xpath('./w:r | ./w:hyperlink/w:r'):
+                    for child in run:
+                        if child.tag == text_tag:
+                            parts.append(child.text or '')
+                        else:
+                            parts.append(special_chars.get(child.tag, ''))
+                paragraphs.append("".join(parts))
+            
+            content = "\n".join(text for text in paragraphs if text)
             return content
         except Exception as e:
             st.error(f"Error extracting DOCX content: {str(e)}")
-            return ""
+            return None
     
     def _clean_text(self, text: str) -> str:
         """Clean and normalize text content."""
         if not text:
             return ""
         
-        # Replace multiple newlines with a single newline
-        text = re.sub(r'\n+', '\n', text)
-        
-        # Replace multiple spaces with a single space
-        text = re.sub(r'\s+', ' ', text)
+        # Replace runs of whitespace, newlines included, with a single space
+        text = _RE_WS.sub(' ', text)
         
         # Remove non-printable characters
-        text = ''.join(c for c in text if c.isprintable() or c == '\n')
+        text = text.translate(_del_table())
+        if not text.isprintable():
+            # Only astral non-printables (or newlines) are left; rare enough
+            # for a per-character pass
+            text = ''.join(c for c in text if c.isprintable() or c == '\n')
         
         return text.strip()
 
@@ -167,27 +571,32 @@ class MedicalReportAnalyzer:
         Returns:
             Dict containing categorized medical findings
         """
-        findings = {
-            'diagnoses': [],
-            'medications': [],
-            'vitals': [],
-            'lab_results': [],
-            'recommendations': []
-        }
+        findings = {category: [] for category in FINDING_CATEGORIES}
         
         if not content:
             return findings
         
-        for category, pattern in self.findings_patterns.items():
-            matches = re.finditer(pattern, content, re.IGNORECASE)
-            findings[category] = []
+        # As with a separate scan per category, a match may not start inside
+        # the previous capture of its own category
+        next_start = {}
+        for match in self._iter_matches(content):
+            category = match.lastgroup
+            if match.start() < next_start.get(category, 0):
+                continue
+            group = self._capture_groups[category]
+            next_start[category] = max(match.end(), match.end(group))
             
-            for match in matches:
-                text = match.group(1).strip()
-                if text and len(text) > 2:
-                    # Normalize the text (remove extra spaces, etc.)
-                    text = re.sub(r'\s+', ' ', text).strip()
-                    findings[category].append(text)
+            # Whitespace is already collapsed by _clean_text
+            text = (match.group(group) or '').strip()
+            if len(text) > 2:
+                findings.setdefault(category, []).append(text)
+        
+        for category, compiled in self._separate_patterns.items():
+            group = 1 if compiled.groups else 0
+            for match in compiled.finditer(content):
+                text = (match.group(group) or '').strip()
+                if len(text) > 2:
+                    findings.setdefault(category, []).append(text)
         
         return findings
 
@@ -205,43 +614,39 @@ class MedicalReportAnalyzer:
             'total_reports': len(self.reports),
             'report_types': self._count_report_types(),
             'report_dates': self._extract_report_dates(),
+            # Union each category across reports, as sorted lists
             'key_findings': {
-                'diagnoses': set(),
-                'medications': set(),
-                'vitals': set(),
-                'lab_results': set(),
-                'recommendations': set()
+                category: sorted(set().union(*self._findings[category]))
+                for category in FINDING_CATEGORIES
             },
             'metadata': {
-                'total_word_count': sum(report['metadata']['word_count'] for report in self.reports),
-                'avg_sentences_per_report': sum(report['metadata']['sentence_count'] for report in self.reports) / len(self.reports)
+                'total_word_count': sum(self._word_counts),
+                'avg_sentences_per_report': statistics.fmean(self._sentence_counts)
             }
         }
         
-        for report in self.reports:
-            for category, items in report['key_findings'].items():
-                summary['key_findings'][category].update(items)
-        
-        # Convert sets to sorted lists
-        for category in summary['key_findings']:
-            summary['key_findings'][category] = sorted(list(summary['key_findings'][category]))
-            if not summary['key_findings'][category]:
-                summary['key_findings'][category] = []
-        
-        self.summary = summary
+        # Streamlit regenerates the summary on every rerun; only a changed
+        # summary invalidates the export
+        if summary != self.summary:
+            self.summary = summary
+            self._generated_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            self._formatted_summary = None
+            self._dirty = True
+            self._version += 1
+            
+            # Chart inputs, so the Analysis tab only does lookups on rerun
+            key_findings = summary['key_findings']
+            self._bar_data = (tuple(key_findings), tuple(len(items) for items in key_findings.values()))
+            self._pie_data = (tuple(summary['report_types']), tuple(summary['report_types'].values()))
         return self.format_summary()
     
     def _count_report_types(self) -> Dict[str, int]:
         """Count the number of reports by file type."""
-        type_counts = {}
-        for report in self.reports:
-            file_type = report['type']
-            type_counts[file_type] = type_counts.get(file_type, 0) + 1
-        return type_counts
+        return dict(Counter(self._types))
     
     def _extract_report_dates(self) -> List[str]:
         """Extract processed dates for all reports."""
-        return [report['date'] for report in self.reports]
+        return list(self._dates)
 
     def format_summary(self) -> str:
         """
@@ -253,8 +658,12 @@ class MedicalReportAnalyzer:
         if not self.summary:
             return "No summary available."
         
+        # Reuse the text until the summary changes
+        if self._formatted_summary is not None:
+            return self._formatted_summary
+        
         formatted = f"""# Medical Report Summary
-Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+Generated: {self._generated_at}
 
 ## Overview
 - **Total Reports**: {self.summary['total_reports']}
@@ -283,6 +692,7 @@ Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 The information above is automatically extracted and may not be complete or accurate.
 Please verify all findings with healthcare professionals.
         """
+        self._formatted_summary = formatted
         return formatted
 
     def _format_list(self, items: List[str]) -> str:
@@ -295,25 +705,108 @@ Please verify all findings with healthcare professionals.
         Returns:
             Formatted string
         """
-        if not items or len(items) == 0:
+        if not items:
             return "- No findings in this category"
         
-        return '\n'.join(f"- {item}" for item in items)
+        return '\n'.join(["- " + item for item in items])
     
     def export_to_json(self) -> str:
         """Export all reports and summary to JSON format."""
+        if not self._dirty and self._json_cache is not None:
+            return self._json_cache
+        
         export_data = {
             'summary': self.summary,
-            'reports': self.reports,
+            'reports': [dict(report, content=self.get_content(i)) for i, report in enumerate(self.reports)],
             'generated_at': datetime.now().isoformat()
         }
         
-        return json.dumps(export_data, indent=2)
+        self._json_cache = json.dumps(export_data, indent=2)
+        self._dirty = False
+        return self._json_cache
     
-    def clear_data(self) -> None:
-        """Reset the analyzer state."""
+    def get_content(self, idx: int) -> str:
+        """
+        Get the cleaned text content of a processed report.
+        
+        Args:
+            idx: Index of the report in self.reports
+            
+        Returns:
+            The decompressed report content
+        """
+        return zlib.decompress(self.reports[idx]['content']).decode('utf-8')
+    
+    def clear_data(self, keep_cache: bool = False) -> None:
+        """
+        Reset the analyzer state.
+        
+        Args:
+            keep_cache: Keep previously processed reports for reuse
+        """
         self.reports = []
         self.summary = {}
+        self._reset_columns()
+        self._seen_hashes = set()
+        self._formatted_summary = None
+        self._dirty = True
+        self._version += 1
+        self._bar_data = self._pie_data = ((), ())
+        if not keep_cache:
+            self._report_cache = {}
+
+
+@st.cache_data(max_entries=32)
+def _bar_fig(version: int, categories: Tuple[str, ...], counts: Tuple[int, ...]):
+    """Build the findings distribution bar chart for a summary version."""
+    import plotly.express as px
+    
+    fig = px.bar(
+        x=list(categories),
+        y=list(counts),
+        labels={"x": "Category", "y": "Count"},
+        title="Distribution of Findings",
+        color=list(counts),
+        color_continuous_scale="Blues",
+        template="plotly_white"
+    )
+    
+    fig.update_layout(height=300)
+    return fig
+
+
+@st.cache_data(max_entries=32)
+def _pie_fig(version: int, file_types: Tuple[str, ...], type_counts: Tuple[int, ...]):
+    """Build the report types pie chart for a summary version."""
+    import plotly.express as px
+    
+    fig = px.pie(
+        values=list(type_counts),
+        names=list(file_types),
+        title="Report Types Distribution",
+        color_discrete_sequence=px.colors.qualitative.Pastel
+    )
+    
+    fig.update_layout(height=300)
+    return fig
+
+
+# UploadedFile.file_id is Streamlit >= 1.26; older releases only have .id
+@st.cache_data(
+    max_entries=32,
+    hash_funcs={"streamlit.runtime.uploaded_file_manager.UploadedFile": lambda f: (getattr(f, "file_id", None) or f.id, f.size)}
+)
+def _build_file_table(files, processed_names: Tuple[str, ...]) -> pd.DataFrame:
+    """Build the uploaded files table, keyed on file ids rather than contents."""
+    return pd.DataFrame([
+        {
+            "Filename": file.name,
+            "Size (KB)": round(file.size / 1024, 2),
+            "Type": Path(file.name).suffix,
+            "Status": "✅ Processed" if file.name in processed_names else "⏳ Pending"
+        }
+        for file in files
+    ])
 
 
 def render_sidebar():
@@ -367,12 +860,8 @@ def render_sidebar():
         # Add a system status section
         with st.expander("System Status"):
             st.markdown("""
-            - **Tokenizer Status**: Checking...
+            - **Sentence Counter**: Built-in (no NLTK data required)
             """)
-            if NLTK_AVAILABLE:
-                st.success("NLTK Tokenizer: Available")
-            else:
-                st.warning("NLTK Tokenizer: Not Available (using fallback)")
             
         # Version information
         st.markdown("---")
@@ -458,15 +947,7 @@ def main():
                 st.session_state.processed_files = []
             
             # Display file information
-            file_df = pd.DataFrame([
-                {
-                    "Filename": file.name,
-                    "Size (KB)": round(file.size / 1024, 2),
-                    "Type": Path(file.name).suffix,
-                    "Status": "✅ Processed" if file.name in st.session_state.processed_files else "⏳ Pending"
-                }
-                for file in uploaded_files
-            ])
+            file_df = _build_file_table(uploaded_files, tuple(st.session_state.processed_files))
             
             st.dataframe(file_df, use_container_width=True, hide_index=True)
             
@@ -478,22 +959,25 @@ def main():
                 analyze_button = st.button("2. Generate Analysis", use_container_width=True)
             
             if process_button:
-                # Reset analyzer to ensure fresh processing
-                st.session_state.analyzer = MedicalReportAnalyzer()
+                # Reset analyzer to ensure fresh processing, keeping cached
+                # results for files that have not changed
+                st.session_state.analyzer.clear_data(keep_cache=True)
                 st.session_state.processed_files = []
                 
                 with st.spinner("Processing files..."):
                     progress_bar = st.progress(0)
                     total_files = len(uploaded_files)
                     
-                    for i, file in enumerate(uploaded_files):
-                        if st.session_state.analyzer.process_file(file):
+                    results = st.session_state.analyzer.process_files(
+                        uploaded_files,
+                        on_progress=lambda done, total: progress_bar.progress(done / total)
+                    )
+                    
+                    for file, ok in zip(uploaded_files, results):
+                        if ok:
                             st.session_state.processed_files.append(file.name)
                         else:
                             st.error(f"Failed to process: {file.name}")
-                        
-                        # Update progress
-                        progress_bar.progress((i + 1) / total_files)
                 
                 st.success(f"Processed {len(st.session_state.processed_files)} of {total_files} files")
         else:
@@ -503,6 +987,7 @@ def main():
         if 'analyzer' in st.session_state and st.session_state.analyzer.reports:
             # If 'analyze_button' was clicked or if reports are already processed
             if analyze_button or st.session_state.edited_summary:
+                analyzer = st.session_state.analyzer
                 summary = st.session_state.analyzer.generate_summary()
                 
                 # Create columns for better layout
@@ -513,35 +998,12 @@ def main():
                 
                 with col1:
                     # Create bar chart of key findings
-                    categories = list(st.session_state.analyzer.summary['key_findings'].keys())
-                    counts = [len(st.session_state.analyzer.summary['key_findings'][cat]) for cat in categories]
-                    
-                    fig = px.bar(
-                        x=categories,
-                        y=counts,
-                        labels={"x": "Category", "y": "Count"},
-                        title="Distribution of Findings",
-                        color=counts,
-                        color_continuous_scale="Blues",
-                        template="plotly_white"
-                    )
-                    
-                    fig.update_layout(height=300)
+                    fig = _bar_fig(analyzer._version, *analyzer._bar_data)
                     st.plotly_chart(fig, use_container_width=True)
                 
                 with col2:
                     # Create a pie chart of file types
-                    file_types = list(st.session_state.analyzer.summary['report_types'].keys())
-                    type_counts = list(st.session_state.analyzer.summary['report_types'].values())
-                    
-                    fig = px.pie(
-                        values=type_counts,
-                        names=file_types,
-                        title="Report Types Distribution",
-                        color_discrete_sequence=px.colors.qualitative.Pastel
-                    )
-                    
-                    fig.update_layout(height=300)
+                    fig = _pie_fig(analyzer._version, *analyzer._pie_data)
                     st.plotly_chart(fig, use_container_width=True)
                 
                 st.divider()
@@ -612,21 +1074,23 @@ def main():
             st.markdown("Customize the regular expressions used to extract findings from reports:")
             
             # Create a copy of patterns to edit
-            patterns_modified = False
+            new_patterns = {}
             
             for category, pattern in st.session_state.analyzer.findings_patterns.items():
-                new_pattern = st.text_input(
+                new_patterns[category] = st.text_input(
                     f"{category.capitalize()} Pattern:",
                     value=pattern,
                     key=f"pattern_{category}"
                 )
-                
-                if new_pattern != pattern:
-                    st.session_state.analyzer.findings_patterns[category] = new_pattern
-                    patterns_modified = True
             
-            if patterns_modified:
-                st.info("Patterns have been modified. Re-process your files to apply changes.")
+            # Invalid patterns are never installed, so the error keeps
+            # showing until the pattern is fixed
+            if new_patterns != st.session_state.analyzer.findings_patterns:
+                try:
+                    st.session_state.analyzer.set_findings_patterns(new_patterns)
+                    st.info("Patterns have been modified. Re-process your files to apply changes.")
+                except re.error as e:
+                    st.error(f"Invalid pattern: {str(e)}")
             
             # Add option to save/load configurations
             st.divider()
@@ -660,7 +1124,7 @@ def main():
                     try:
                         config_data = json.loads(config_file.getvalue().decode('utf-8'))
                         if "patterns" in config_data:
-                            st.session_state.analyzer.findings_patterns = config_data["patterns"]
+                            st.session_state.analyzer.set_findings_patterns(config_data["patterns"])
                             st.success("Configuration loaded successfully!")
                         else:
                             st.error("Invalid configuration file!")